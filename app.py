@@ -2,13 +2,30 @@ import os
 import logging
 import uuid
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_from_directory
+from flask import Flask, request, jsonify, render_template, send_from_directory, Response, stream_with_context
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
+from concurrent.futures import ThreadPoolExecutor
 import json
 
+try:
+    import orjson
+    from flask.json.provider import JSONProvider
+
+    class ORJSONProvider(JSONProvider):
+        """Flask JSON provider backed by orjson (also serializes NumPy directly)"""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+except ImportError:
+    orjson = None
+
 # Import custom modules
 from models.rag_pipeline import RAGPipeline
+from models.semantic_cache import SemanticCache
 from utils.document_processor import DocumentProcessor
 from utils.legal_knowledge import LegalKnowledgeBase
 
@@ -29,6 +46,10 @@ app.config['MAX_CONTENT_LENGTH'] = 50 * 1024 * 1024  # 50MB max file size
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
 app.config['SECRET_KEY'] = os.urandom(24)
 
+# Use orjson for request/response serialization when available
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
 # Allowed file extensions
 ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'}
 
@@ -36,6 +57,7 @@ ALLOWED_EXTENSIONS = {'pdf', 'png', 'jpg', 'jpeg', 'tiff', 'bmp'}
 rag_pipeline = None
 doc_processor = None
 legal_kb = None
+semantic_cache = None
 
 def allowed_file(filename):
     """Check if file extension is allowed"""
@@ -43,31 +65,48 @@ def allowed_file(filename):
 
 def init_app():
     """Initialize application components"""
-    global rag_pipeline, doc_processor, legal_kb
+    global rag_pipeline, doc_processor, legal_kb, semantic_cache
     
     try:
         logger.info("Initializing application components...")
-        
+
         # Create upload directory
         os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-        
-        # Initialize document processor
-        logger.info("Initializing document processor...")
-        doc_processor = DocumentProcessor()
-        
-        # Initialize legal knowledge base
-        logger.info("Initializing legal knowledge base...")
-        legal_kb = LegalKnowledgeBase()
-        legal_kb.load_legal_documents()
-        
-        # Initialize RAG pipeline
-        logger.info("Initializing RAG pipeline...")
-        rag_pipeline = RAGPipeline()
-        rag_pipeline.initialize()
-        
-        # Index legal documents
+
+        def _init_doc_processor():
+            logger.info("Initializing document processor...")
+            return DocumentProcessor()
+
+        def _init_legal_kb():
+            logger.info("Initializing legal knowledge base...")
+            kb = LegalKnowledgeBase()
+            kb.load_legal_documents()
+            return kb
+
+        def _init_rag_pipeline():
+            logger.info("Initializing RAG pipeline...")
+            pipeline = RAGPipeline()
+            pipeline.initialize()
+            return pipeline
+
+        # These stages are independent and I/O-dominated (model downloads,
+        # Ollama pull, corpus parsing), so overlap them instead of serializing
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            doc_processor_future = executor.submit(_init_doc_processor)
+            legal_kb_future = executor.submit(_init_legal_kb)
+            rag_pipeline_future = executor.submit(_init_rag_pipeline)
+
+            doc_processor = doc_processor_future.result()
+            legal_kb = legal_kb_future.result()
+            rag_pipeline = rag_pipeline_future.result()
+
+        # Indexing needs both the knowledge base and the embedding model
         logger.info("Indexing legal documents...")
         rag_pipeline.index_legal_documents(legal_kb.get_all_documents())
+
+        # Initialize semantic cache for chat responses
+        logger.info("Initializing semantic cache...")
+        semantic_cache = SemanticCache(rag_pipeline.embedding_manager)
         
         logger.info("Application initialization completed successfully!")
         
@@ -97,23 +136,19 @@ def upload_file():
         # Generate unique filename
         file_id = str(uuid.uuid4())
         filename = secure_filename(f"{file_id}_{file.filename}")
-        file_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        
-        # Save file
-        file.save(file_path)
         logger.info(f"File uploaded: {filename}")
-        
-        # Process document
-        extracted_text = doc_processor.extract_text(file_path)
+
+        # Process document in memory, skipping the disk save/read/delete cycle
+        extracted_text = doc_processor.extract_text_from_bytes(file.read(), filename)
         if not extracted_text:
-            os.remove(file_path)  # Clean up
             return jsonify({'error': 'Failed to extract text from document'}), 400
-        
+
         # Index document in RAG pipeline
         doc_id = rag_pipeline.index_document(extracted_text, filename)
-        
-        # Clean up uploaded file
-        os.remove(file_path)
+
+        # Cached answers may be stale now that the corpus changed
+        if semantic_cache:
+            semantic_cache.clear()
         
         return jsonify({
             'success': True,
@@ -144,14 +179,70 @@ def chat():
         document_id = data.get('document_id')  # Optional: query specific document
         
         logger.info(f"Processing query: {user_message[:100]}...")
-        
+
+        # Return cached answer for repeated or semantically identical questions
+        if semantic_cache:
+            cached_response = semantic_cache.get(user_message, document_id)
+            if cached_response:
+                # Match the negotiated response shape: clients that asked for
+                # SSE get the cached answer replayed as events, not JSON
+                if data.get('stream'):
+                    def replay():
+                        events = [
+                            {
+                                'type': 'sources',
+                                'sources': cached_response.get('sources', []),
+                                'confidence': cached_response.get('confidence', 0.0)
+                            },
+                            {
+                                'type': 'done',
+                                'answer': cached_response['answer'],
+                                'sources': cached_response.get('sources', []),
+                                'confidence': cached_response.get('confidence', 0.0),
+                                'processing_time': cached_response.get('processing_time', 0.0),
+                                'cached': True
+                            }
+                        ]
+                        for event in events:
+                            payload = orjson.dumps(event).decode('utf-8') if orjson else json.dumps(event)
+                            yield f"data: {payload}\n\n"
+
+                    return Response(stream_with_context(replay()), mimetype='text/event-stream')
+
+                return jsonify({
+                    'success': True,
+                    'response': cached_response['answer'],
+                    'sources': cached_response.get('sources', []),
+                    'confidence': cached_response.get('confidence', 0.0),
+                    'processing_time': cached_response.get('processing_time', 0.0),
+                    'cached': True
+                })
+
+        # Stream the answer as server-sent events when the client asks for it
+        if data.get('stream'):
+            def generate():
+                for event in rag_pipeline.query_stream(
+                    user_message,
+                    document_id=document_id,
+                    max_tokens=1000
+                ):
+                    if event.get('type') == 'done' and semantic_cache:
+                        semantic_cache.put(user_message, document_id, event)
+                    payload = orjson.dumps(event).decode('utf-8') if orjson else json.dumps(event)
+                    yield f"data: {payload}\n\n"
+
+            return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
         # Get response from RAG pipeline
         response = rag_pipeline.query(
-            user_message, 
+            user_message,
             document_id=document_id,
             max_tokens=1000
         )
-        
+
+        if semantic_cache:
+            semantic_cache.put(user_message, document_id, response)
+
         return jsonify({
             'success': True,
             'response': response['answer'],
@@ -194,7 +285,10 @@ def clear_session():
     try:
         if rag_pipeline:
             rag_pipeline.clear_user_documents()
-        
+
+        if semantic_cache:
+            semantic_cache.clear()
+
         return jsonify({
             'success': True,
             'message': 'Session cleared successfully'
@@ -214,12 +308,16 @@ def internal_error(error):
     return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    # Development fallback only. In production run:
+    #   gunicorn -c gunicorn.conf.py app:app
+    # which forks multiple workers (init_app runs post-fork) so concurrent
+    # requests are not serialized behind a single process GIL.
     try:
         init_app()
         logger.info("Starting Flask application...")
         app.run(
-            host='0.0.0.0', 
-            port=8000, 
+            host='0.0.0.0',
+            port=8000,
             debug=False,  # Set to True for development
             threaded=True
         )
@@ -0,0 +1,45 @@
+import fcntl
+import multiprocessing
+import os
+
+# Production server configuration: process-level parallelism so concurrent
+# embedding/retrieval work is not serialized behind a single GIL.
+bind = "0.0.0.0:8000"
+workers = max(2, multiprocessing.cpu_count() // 2)
+worker_class = "gthread"
+threads = 4
+# The heartbeat a worker misses on timeout only starts ticking once its run
+# loop is up, but init_app runs in post_fork — a cold boot (model downloads,
+# ONNX export + quantization, embedding the whole corpus) can take many
+# minutes, and the workers queued on the init lock wait just as long. Budget
+# for first-boot init, not for a single request; gthread requests are not
+# aborted by this value anyway.
+timeout = 1800
+
+# Split the math-library thread budget across workers before torch starts;
+# otherwise every worker spins up cpu_count OpenMP threads and the box runs
+# workers * cpu_count threads on cpu_count cores
+_threads_per_worker = max(1, multiprocessing.cpu_count() // workers)
+os.environ.setdefault("OMP_NUM_THREADS", str(_threads_per_worker))
+os.environ.setdefault("MKL_NUM_THREADS", str(_threads_per_worker))
+
+# Load the app module once in the master so imported code is shared
+# copy-on-write; the heavy components (models, vector store) are built
+# per worker in post_fork and are not shared.
+preload_app = True
+
+def post_fork(server, worker):
+    """Initialize per-worker components after the fork"""
+    from app import init_app
+
+    # First boot extracts the corpus, writes the warm-start caches and
+    # indexes into Chroma's sqlite store — none of which tolerate concurrent
+    # multi-process writers. Take an exclusive lock so workers initialize
+    # one at a time; warm boots hold it only while re-reading the caches.
+    lock_fd = os.open(".gunicorn-init.lock", os.O_CREAT | os.O_WRONLY, 0o644)
+    try:
+        fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        init_app()
+    finally:
+        fcntl.flock(lock_fd, fcntl.LOCK_UN)
+        os.close(lock_fd)
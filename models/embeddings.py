@@ -1,4 +1,14 @@
+import os
+
+# Size the math-library thread pools before torch initializes them
+os.environ.setdefault("OMP_NUM_THREADS", str(os.cpu_count()))
+os.environ.setdefault("MKL_NUM_THREADS", str(os.cpu_count()))
+
+import atexit
+import hashlib
 import logging
+import pickle
+from collections import OrderedDict
 import numpy as np
 from typing import List, Any
 from sentence_transformers import SentenceTransformer
@@ -9,93 +19,341 @@ logger = logging.getLogger(__name__)
 class EmbeddingManager:
     """Manages text embeddings for RAG pipeline"""
     
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", onnx_dir: str = "./model_cache"):
         self.model_name = model_name
         self.model = None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.embedding_dim = 384  # Dimension for all-MiniLM-L6-v2
-        
+        self.onnx_dir = onnx_dir
+        self.ort_session = None
+
+        # LRU cache of text hash -> embedding, persisted across restarts
+        self._emb_cache = OrderedDict()
+        self._emb_cache_maxsize = 50000
+        self._emb_cache_path = os.path.join(onnx_dir, "embedding_cache.pkl")
+
         self._load_model()
-    
+        self._load_cache()
+        atexit.register(self.save_cache)
+
     def _load_model(self):
         """Load the sentence transformer model"""
         try:
             logger.info(f"Loading embedding model: {self.model_name}")
-            
+
+            # Use the whole core budget for intra-op parallelism on CPU
+            # inference; under gunicorn the budget is divided per worker via
+            # OMP_NUM_THREADS so N workers don't oversubscribe the box
+            if self.device.type == "cpu":
+                try:
+                    num_threads = int(os.environ.get("OMP_NUM_THREADS") or os.cpu_count())
+                    torch.set_num_threads(num_threads)
+                    torch.set_num_interop_threads(1)
+                    torch.backends.mkldnn.enabled = True
+                    logger.info(f"CPU inference threads set to {num_threads}")
+                except Exception as e:
+                    logger.warning(f"Failed to configure CPU threads: {str(e)}")
+
             self.model = SentenceTransformer(self.model_name, device=self.device)
-            
+
+            # A fast (Rust) tokenizer keeps tokenization off the critical path;
+            # the slow Python tokenizer becomes the bottleneck at batch sizes
+            if not getattr(self.model.tokenizer, "is_fast", False):
+                try:
+                    from transformers import AutoTokenizer
+                    tokenizer_source = getattr(self.model.tokenizer, "name_or_path", self.model_name)
+                    self.model[0].tokenizer = AutoTokenizer.from_pretrained(
+                        tokenizer_source, use_fast=True
+                    )
+                    logger.info("Replaced slow tokenizer with fast batch-encoding tokenizer")
+                except Exception as e:
+                    logger.warning(f"Failed to load fast tokenizer: {str(e)}")
+
             # Get actual embedding dimension
             test_embedding = self.model.encode(["test"])
             self.embedding_dim = len(test_embedding[0])
-            
+
             logger.info(f"Embedding model loaded successfully on {self.device}")
             logger.info(f"Embedding dimension: {self.embedding_dim}")
-            
+
+            # Serve inference through ONNX Runtime when available (faster than eager PyTorch)
+            self._init_onnx_session()
+
+            # Halve memory bandwidth with bf16 weights on the PyTorch path
+            if self.ort_session is None:
+                self._apply_bf16()
+
         except Exception as e:
             logger.error(f"Failed to load embedding model: {str(e)}")
             raise
+
+    def _init_onnx_session(self):
+        """Export the transformer to ONNX and create an ONNX Runtime session"""
+        try:
+            import onnxruntime as ort
+
+            os.makedirs(self.onnx_dir, exist_ok=True)
+            # v2: earlier exports traced inputs in tokenizer-dict order, which
+            # swapped attention_mask and token_type_ids; the new name forces a
+            # re-export (and re-quantization) of any cached broken graph
+            onnx_path = os.path.join(
+                self.onnx_dir,
+                f"{self.model_name.replace('/', '_')}.v2.onnx"
+            )
+
+            if not os.path.exists(onnx_path):
+                logger.info(f"Exporting embedding model to ONNX: {onnx_path}")
+
+                auto_model = self.model[0].auto_model
+                dummy = self.model.tokenizer(
+                    ["test"],
+                    padding=True,
+                    truncation=True,
+                    return_tensors="pt"
+                )
+                # Positional args must follow the transformer's forward
+                # signature (input_ids, attention_mask, token_type_ids); the
+                # tokenizer dict orders token_type_ids before attention_mask,
+                # and tracing in that order silently swaps the two inputs
+                forward_order = ("input_ids", "attention_mask", "token_type_ids")
+                input_names = [name for name in forward_order if name in dummy]
+                dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+                dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+                torch.onnx.export(
+                    auto_model,
+                    tuple(dummy[name].to(self.device) for name in input_names),
+                    onnx_path,
+                    input_names=input_names,
+                    output_names=["last_hidden_state"],
+                    dynamic_axes=dynamic_axes,
+                    opset_version=14
+                )
+
+            # On CPU, dynamic int8 quantization roughly doubles throughput
+            # (VNNI int8 dot products) with negligible retrieval quality loss
+            if self.device.type == "cpu":
+                try:
+                    quantized_path = onnx_path.replace(".onnx", ".int8.onnx")
+
+                    if not os.path.exists(quantized_path):
+                        from onnxruntime.quantization import quantize_dynamic, QuantType
+                        logger.info(f"Quantizing embedding model to int8: {quantized_path}")
+                        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+
+                    onnx_path = quantized_path
+                    logger.info("Using int8-quantized ONNX embedding model")
+                except Exception as e:
+                    logger.warning(f"int8 quantization unavailable, using fp32 ONNX: {str(e)}")
+
+            providers = ["CPUExecutionProvider"]
+            if self.device.type == "cuda":
+                providers.insert(0, "CUDAExecutionProvider")
+
+            self.ort_session = ort.InferenceSession(onnx_path, providers=providers)
+            self._ort_input_names = {inp.name for inp in self.ort_session.get_inputs()}
+
+            logger.info(f"ONNX Runtime session initialized with providers: {providers}")
+
+        except Exception as e:
+            logger.warning(f"ONNX Runtime unavailable, falling back to PyTorch: {str(e)}")
+            self.ort_session = None
+
+    def _apply_bf16(self):
+        """Run the transformer in bfloat16 with fp32 upcast before pooling"""
+        if self.device.type != "cuda":
+            return
+
+        try:
+            transformer = self.model[0].auto_model
+            transformer.to(torch.bfloat16)
+
+            # Upcast hidden states to fp32 so pooling and normalization stay accurate
+            original_forward = transformer.forward
+
+            def forward_fp32(*args, **kwargs):
+                output = original_forward(*args, **kwargs)
+                if hasattr(output, "last_hidden_state"):
+                    output.last_hidden_state = output.last_hidden_state.float()
+                return output
+
+            transformer.forward = forward_fp32
+
+            logger.info("Embedding model running in bfloat16")
+
+        except Exception as e:
+            logger.warning(f"Failed to enable bfloat16, staying in fp32: {str(e)}")
+
+    def _embed_with_onnx(self, texts: List[str]) -> np.ndarray:
+        """Embed a batch of texts through the ONNX Runtime session"""
+        encoded = self.model.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.model.max_seq_length,
+            return_tensors="np"
+        )
+
+        feeds = {
+            name: encoded[name].astype(np.int64)
+            for name in encoded.keys()
+            if name in self._ort_input_names
+        }
+
+        last_hidden_state = self.ort_session.run(None, feeds)[0]
+
+        # Mean pooling over non-padding tokens, then L2 normalize
+        mask = encoded["attention_mask"][..., np.newaxis].astype(np.float32)
+        summed = (last_hidden_state * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        embeddings = summed / counts
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.clip(norms, 1e-12, None)
+
+        return embeddings
     
-    def embed_texts(self, texts: List[str], batch_size: int = 32) -> List[List[float]]:
-        """Generate embeddings for a list of texts"""
+    def embed_texts(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Generate embeddings for a list of texts as a (N, dim) float32 array"""
         if not texts:
-            return []
-        
+            return np.empty((0, self.embedding_dim), dtype=np.float32)
+
         try:
             # Clean texts
             cleaned_texts = [str(text).strip() for text in texts if text and str(text).strip()]
-            
+
             if not cleaned_texts:
-                return []
-            
-            # Generate embeddings in batches
-            all_embeddings = []
-            
-            for i in range(0, len(cleaned_texts), batch_size):
-                batch_texts = cleaned_texts[i:i + batch_size]
-                
-                # Generate embeddings
-                batch_embeddings = self.model.encode(
-                    batch_texts,
-                    convert_to_tensor=False,
-                    show_progress_bar=False,
-                    normalize_embeddings=True
-                )
-                
-                # Convert to list of lists
-                if isinstance(batch_embeddings, np.ndarray):
-                    batch_embeddings = batch_embeddings.tolist()
-                
-                all_embeddings.extend(batch_embeddings)
-            
-            logger.debug(f"Generated embeddings for {len(texts)} texts")
-            return all_embeddings
-            
+                return np.empty((0, self.embedding_dim), dtype=np.float32)
+
+            # Serve cached embeddings; run the encoder only for misses
+            keys = [
+                hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+                for text in cleaned_texts
+            ]
+            results = [None] * len(cleaned_texts)
+            misses = {}
+
+            for pos, key in enumerate(keys):
+                cached = self._emb_cache.get(key)
+                if cached is not None:
+                    self._emb_cache.move_to_end(key)
+                    results[pos] = cached
+                else:
+                    misses.setdefault(key, []).append(pos)
+
+            if misses:
+                miss_texts = [cleaned_texts[positions[0]] for positions in misses.values()]
+                encoded = self._encode_uncached(miss_texts, batch_size)
+
+                for (key, positions), embedding in zip(misses.items(), encoded):
+                    self._emb_cache[key] = embedding
+                    for pos in positions:
+                        results[pos] = embedding
+
+                while len(self._emb_cache) > self._emb_cache_maxsize:
+                    self._emb_cache.popitem(last=False)
+
+            logger.debug(
+                f"Embedded {len(cleaned_texts)} texts "
+                f"({len(cleaned_texts) - len(misses)} cache hits)"
+            )
+            return np.ascontiguousarray(np.stack(results), dtype=np.float32)
+
         except Exception as e:
             logger.error(f"Failed to generate embeddings: {str(e)}")
             raise
-    
-    def embed_text(self, text: str) -> List[float]:
+
+    def _encode_uncached(self, cleaned_texts: List[str], batch_size: int) -> np.ndarray:
+        """Run the encoder for texts that missed the embedding cache"""
+        if self.ort_session is not None:
+            # Sort by length so each batch pads only to its own longest sequence
+            order = np.argsort([len(t.split()) for t in cleaned_texts])
+            sorted_texts = [cleaned_texts[i] for i in order]
+
+            sorted_embeddings = np.concatenate([
+                self._embed_with_onnx(sorted_texts[i:i + batch_size])
+                for i in range(0, len(sorted_texts), batch_size)
+            ])
+
+            # Scatter results back to the original input order
+            all_embeddings = np.empty_like(sorted_embeddings)
+            all_embeddings[order] = sorted_embeddings
+        else:
+            # sentence-transformers batches (and length-sorts) internally
+            all_embeddings = self.model.encode(
+                cleaned_texts,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+                normalize_embeddings=True
+            )
+
+        return np.ascontiguousarray(all_embeddings, dtype=np.float32)
+
+    def _load_cache(self):
+        """Load the persisted embedding cache from disk"""
+        try:
+            if os.path.exists(self._emb_cache_path):
+                with open(self._emb_cache_path, 'rb') as f:
+                    self._emb_cache = pickle.load(f)
+                logger.info(f"Loaded {len(self._emb_cache)} cached embeddings from disk")
+        except Exception as e:
+            logger.warning(f"Failed to load embedding cache: {str(e)}")
+            self._emb_cache = OrderedDict()
+
+    def save_cache(self):
+        """Persist the embedding cache to disk"""
+        try:
+            if self._emb_cache:
+                os.makedirs(self.onnx_dir, exist_ok=True)
+                # Write to a pid-suffixed temp file and rename: several
+                # gunicorn workers save through atexit on shutdown, and
+                # concurrent bare writes can interleave into a torn pickle
+                tmp_path = f"{self._emb_cache_path}.tmp.{os.getpid()}"
+                with open(tmp_path, 'wb') as f:
+                    pickle.dump(self._emb_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, self._emb_cache_path)
+                logger.info(f"Persisted {len(self._emb_cache)} cached embeddings to disk")
+        except Exception as e:
+            logger.warning(f"Failed to persist embedding cache: {str(e)}")
+
+    def embed_text(self, text: str) -> np.ndarray:
         """Generate embedding for a single text"""
         embeddings = self.embed_texts([text])
-        return embeddings[0] if embeddings else []
-    
+        # Zero vector (not np.empty garbage) so dot products against the
+        # fallback are deterministic for whitespace-only input
+        return embeddings[0] if len(embeddings) else np.zeros(self.embedding_dim, dtype=np.float32)
+
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calculate cosine similarity between two texts"""
         try:
             embeddings = self.embed_texts([text1, text2])
             if len(embeddings) != 2:
                 return 0.0
-            
-            # Calculate cosine similarity
-            emb1 = np.array(embeddings[0])
-            emb2 = np.array(embeddings[1])
-            
-            similarity = np.dot(emb1, emb2) / (np.linalg.norm(emb1) * np.linalg.norm(emb2))
-            return float(similarity)
-            
+
+            # Embeddings are already L2-normalized, so cosine is a plain dot product
+            return float(embeddings[0] @ embeddings[1])
+
         except Exception as e:
             logger.error(f"Failed to calculate similarity: {str(e)}")
             return 0.0
+
+    def calculate_similarities(self, query: str, candidates: List[str]) -> np.ndarray:
+        """Calculate cosine similarities between a query and many candidates"""
+        try:
+            if not candidates:
+                return np.empty(0, dtype=np.float32)
+
+            embeddings = self.embed_texts([query] + candidates)
+            if len(embeddings) != len(candidates) + 1:
+                return np.zeros(len(candidates), dtype=np.float32)
+
+            # One matrix-vector product covers all candidates at once
+            return embeddings[1:] @ embeddings[0]
+
+        except Exception as e:
+            logger.error(f"Failed to calculate similarities: {str(e)}")
+            return np.zeros(len(candidates), dtype=np.float32)
     
     def get_embedding_info(self) -> dict:
         """Get information about the embedding model"""
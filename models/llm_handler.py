@@ -1,4 +1,5 @@
 import logging
+import re
 import time
 import requests
 import json
@@ -7,8 +8,17 @@ import sys
 import os
 from typing import Dict, Any, Optional
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Precompiled cleanup patterns for response post-processing
+_LABEL_RE = re.compile(r"^(?:Answer|Response):\s*", re.MULTILINE)
+_REPEATED_LINE_RE = re.compile(r"^(.+)(?:\n\1)+$", re.MULTILINE)
+
 class LLMHandler:
     """Handler for local LLaMA2 model via Ollama"""
     
@@ -17,6 +27,9 @@ class LLMHandler:
         self.base_url = "http://localhost:11434"
         self.api_url = f"{self.base_url}/api/generate"
         self.model_loaded = False
+
+        # Pooled HTTP session so every Ollama call reuses a persistent connection
+        self.session = requests.Session()
         
         # Model configuration
         self.generation_config = {
@@ -25,8 +38,13 @@ class LLMHandler:
             "top_k": 40,
             "repeat_penalty": 1.1,
             "num_predict": 2000,
+            "num_ctx": 4096,
+            "cache_prompt": True,  # Reuse the KV-cache for shared prompt prefixes
             "stop": ["Human:", "Assistant:", "\n\n---"]
         }
+
+        # Keep the model (and its prompt cache) resident between requests
+        self.keep_alive = "30m"
     
     def initialize(self):
         """Initialize the LLM handler"""
@@ -56,7 +74,7 @@ class LLMHandler:
     def _check_ollama_running(self) -> bool:
         """Check if Ollama service is running"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=5)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
             return response.status_code == 200
         except:
             return False
@@ -86,7 +104,7 @@ class LLMHandler:
     def _check_model_available(self) -> bool:
         """Check if the model is available locally"""
         try:
-            response = requests.get(f"{self.base_url}/api/tags", timeout=10)
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=10)
             if response.status_code == 200:
                 models = response.json().get("models", [])
                 for model in models:
@@ -101,7 +119,7 @@ class LLMHandler:
         try:
             pull_data = {"name": self.model_name}
             
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/api/pull",
                 json=pull_data,
                 stream=True,
@@ -114,7 +132,7 @@ class LLMHandler:
             # Process streaming response
             for line in response.iter_lines():
                 if line:
-                    data = json.loads(line.decode('utf-8'))
+                    data = orjson.loads(line) if orjson else json.loads(line.decode('utf-8'))
                     if data.get("status"):
                         logger.info(f"Model pull: {data['status']}")
                     if data.get("error"):
@@ -156,6 +174,7 @@ class LLMHandler:
                 "model": self.model_name,
                 "prompt": prompt,
                 "stream": False,
+                "keep_alive": self.keep_alive,
                 "options": {
                     **self.generation_config,
                     "num_predict": min(max_tokens, 2000)
@@ -164,7 +183,7 @@ class LLMHandler:
             
             # Make API call
             start_time = time.time()
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 json=request_data,
                 timeout=120  # 2 minutes timeout
@@ -193,52 +212,100 @@ class LLMHandler:
             logger.error(f"LLM generation error: {str(e)}")
             return "I encountered an error while processing your request. Please try again."
     
+    def generate_response_stream(self, question: str, context: str = "", max_tokens: int = 1000):
+        """Yield response chunks from the model as they are generated"""
+        if not self.model_loaded:
+            yield "Model not loaded. Please check the system status."
+            return
+
+        try:
+            prompt = self._create_prompt(question, context)
+
+            request_data = {
+                "model": self.model_name,
+                "prompt": prompt,
+                "stream": True,
+                "keep_alive": self.keep_alive,
+                "options": {
+                    **self.generation_config,
+                    "num_predict": min(max_tokens, 2000)
+                }
+            }
+
+            start_time = time.time()
+            response = self.session.post(
+                self.api_url,
+                json=request_data,
+                stream=True,
+                timeout=120
+            )
+
+            if response.status_code != 200:
+                logger.error(f"LLM API error: {response.status_code} - {response.text}")
+                yield "I apologize, but I'm experiencing technical difficulties. Please try again."
+                return
+
+            for line in response.iter_lines():
+                if not line:
+                    continue
+
+                data = orjson.loads(line) if orjson else json.loads(line.decode('utf-8'))
+                chunk = data.get("response", "")
+                if chunk:
+                    yield chunk
+                if data.get("done"):
+                    break
+
+            logger.info(f"Streamed response in {time.time() - start_time:.2f} seconds")
+
+        except requests.exceptions.Timeout:
+            logger.error("LLM request timeout")
+            yield "The request is taking longer than expected. Please try with a simpler question."
+        except Exception as e:
+            logger.error(f"LLM streaming error: {str(e)}")
+            yield "I encountered an error while processing your request. Please try again."
+
     def _create_prompt(self, question: str, context: str = "") -> str:
-        """Create a structured prompt for legal question answering"""
-        
+        """Create a structured prompt for legal question answering
+
+        The static instructions and retrieved context form the prompt prefix,
+        with the variable question at the end, so consecutive requests that
+        share retrieved chunks hit llama.cpp's prompt cache instead of
+        re-prefilling thousands of context tokens.
+        """
         if context.strip():
-            prompt = f"""You are a knowledgeable legal assistant. Answer the question based on the provided context. Be accurate, concise, and cite relevant sections when possible.
+            prompt = f"""You are a knowledgeable legal assistant. Answer the question based on the provided context. Be accurate, concise, and cite relevant sections when possible. If the context doesn't contain enough information, say so clearly.
 
 Context:
 {context}
 
 Question: {question}
 
-Answer: Provide a clear, accurate response based on the context above. If the context doesn't contain enough information, say so clearly."""
+Answer:"""
         else:
-            prompt = f"""You are a knowledgeable legal assistant with expertise in Indian law. Provide accurate, helpful information about legal matters.
+            prompt = f"""You are a knowledgeable legal assistant with expertise in Indian law. Provide accurate, helpful information about legal matters. If you're not certain about specific details, mention that and suggest consulting with a qualified legal professional.
 
 Question: {question}
 
-Answer: Provide a clear, accurate legal response. If you're not certain about specific details, mention that and suggest consulting with a qualified legal professional."""
-        
+Answer:"""
+
         return prompt
     
     def _post_process_response(self, response: str) -> str:
-        """Clean and format the model response"""
-        # Remove common artifacts
-        response = response.replace("Answer:", "").strip()
-        response = response.replace("Response:", "").strip()
-        
-        # Remove repetitive patterns
-        lines = response.split('\n')
-        cleaned_lines = []
-        prev_line = ""
-        
-        for line in lines:
-            line = line.strip()
-            if line and line != prev_line:
-                cleaned_lines.append(line)
-                prev_line = line
-        
-        response = '\n\n'.join(cleaned_lines)
-        
+        """Clean and format the model response with precompiled regexes"""
+        if not response:
+            return ""
+
+        # Remove common artifacts and collapse repeated lines in C-level passes
+        text = _LABEL_RE.sub("", response.strip())
+        text = _REPEATED_LINE_RE.sub(r"\1", text)
+
         # Limit response length
         max_length = 2000
-        if len(response) > max_length:
-            response = response[:max_length] + "..."
-        
-        return response.strip()
+        if len(text) > max_length:
+            text = text[:max_length] + "..."
+
+        return text.strip()
     
     def get_model_status(self) -> Dict[str, Any]:
         """Get current model status"""
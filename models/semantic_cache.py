@@ -0,0 +1,135 @@
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class SemanticCache:
+    """Two-tier cache for chat responses: exact match plus semantic lookup"""
+
+    def __init__(self, embedding_manager, maxsize: int = 10000, ttl: float = 3600,
+                 similarity_threshold: float = 0.95):
+        self.embedding_manager = embedding_manager
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+
+        # key -> (timestamp, scope, embedding, response); ordered for LRU eviction
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Stacked embeddings for one-shot similarity search, rebuilt lazily
+        self._matrix = None
+        self._matrix_keys = []
+
+    @staticmethod
+    def _make_key(message: str, document_id: Optional[str]) -> str:
+        return hashlib.sha256(f"{message}|{document_id}".encode("utf-8")).hexdigest()
+
+    def _purge_expired(self):
+        """Drop entries older than the TTL (caller holds the lock)"""
+        now = time.time()
+        expired = [key for key, entry in self._entries.items() if now - entry[0] > self.ttl]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._matrix = None
+
+    def _rebuild_matrix(self):
+        """Restack cached embeddings for vectorized lookup (caller holds the lock)"""
+        if self._entries:
+            self._matrix = np.stack([entry[2] for entry in self._entries.values()])
+            self._matrix_keys = list(self._entries.keys())
+        else:
+            self._matrix = np.empty((0, self.embedding_manager.embedding_dim), dtype=np.float32)
+            self._matrix_keys = []
+
+    def get(self, message: str, document_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Look up a cached response, exact match first then nearest neighbour"""
+        try:
+            key = self._make_key(message, document_id)
+
+            with self._lock:
+                self._purge_expired()
+
+                # Tier 1: exact match
+                entry = self._entries.get(key)
+                if entry is not None:
+                    self._entries.move_to_end(key)
+                    logger.debug("Semantic cache exact hit")
+                    return dict(entry[3])
+
+                if not self._entries:
+                    return None
+
+                if self._matrix is None:
+                    self._rebuild_matrix()
+                matrix = self._matrix
+                matrix_keys = self._matrix_keys
+
+            # Tier 2: semantic match (embed outside the lock)
+            query_embedding = self.embedding_manager.embed_text(message)
+            similarities = matrix @ query_embedding
+
+            with self._lock:
+                # Consider only entries scoped to the same document
+                best_key = None
+                best_similarity = self.similarity_threshold
+                for idx in np.argsort(similarities)[::-1]:
+                    if similarities[idx] < best_similarity:
+                        break
+                    candidate = self._entries.get(matrix_keys[idx])
+                    if candidate is not None and candidate[1] == document_id:
+                        best_key = matrix_keys[idx]
+                        best_similarity = similarities[idx]
+                        break
+
+                if best_key is not None:
+                    self._entries.move_to_end(best_key)
+                    logger.debug(f"Semantic cache hit (similarity: {best_similarity:.3f})")
+                    return dict(self._entries[best_key][3])
+
+            return None
+
+        except Exception as e:
+            logger.error(f"Semantic cache lookup failed: {str(e)}")
+            return None
+
+    def put(self, message: str, document_id: Optional[str], response: Dict[str, Any]):
+        """Cache a response keyed by both text hash and query embedding"""
+        try:
+            key = self._make_key(message, document_id)
+            embedding = self.embedding_manager.embed_text(message)
+
+            with self._lock:
+                while len(self._entries) >= self.maxsize:
+                    self._entries.popitem(last=False)
+
+                self._entries[key] = (time.time(), document_id, embedding, dict(response))
+                self._matrix = None
+
+        except Exception as e:
+            logger.error(f"Semantic cache insert failed: {str(e)}")
+
+    def clear(self):
+        """Invalidate the whole cache (e.g. after the document corpus changes)"""
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._matrix_keys = []
+        logger.info("Semantic cache cleared")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current cache statistics"""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "similarity_threshold": self.similarity_threshold
+            }
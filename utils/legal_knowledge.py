@@ -1,5 +1,12 @@
 import os
+import functools
+import hashlib
 import logging
+import multiprocessing
+import pickle
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List, Dict, Any
 import json
 import PyPDF2
@@ -7,8 +14,263 @@ import fitz  # PyMuPDF - better PDF extraction
 from pathlib import Path
 import re
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# google-re2's linear-time engine avoids backtracking blowups on adversarial
+# whitespace runs in scanned PDFs; fall back to the stdlib engine otherwise
+try:
+    import re2 as _regex
+except ImportError:
+    _regex = re
+
 logger = logging.getLogger(__name__)
 
+# Cleanup patterns compiled once; _clean_extracted_text runs them over the
+# full text of every PDF
+_WS_RE = _regex.compile(r'\s+')
+_HYPHEN_RE = _regex.compile(r'(\w)-\s*\n\s*(\w)')
+_MULTI_NL_RE = _regex.compile(r'\n\s*\n\s*\n+')
+_PAGE_HEADER_RE = _regex.compile(r'Page \d+.*?\n', _regex.IGNORECASE)
+
+# Drops null bytes and folds vertical tab / form feed to spaces in one
+# C-level pass before the regex cleanup passes run
+_CLEAN_TABLE = {0: None, 0x0b: 32, 0x0c: 32}
+
+@functools.lru_cache(maxsize=256)
+def _compile_query(query_bytes: bytes):
+    """Compile a literal search query once and reuse it across calls"""
+    return re.compile(re.escape(query_bytes))
+
+# Tokenizer for the inverted search index (folded-bytes domain)
+_TOKEN_RE = re.compile(rb'\w+')
+
+# Bump when extraction or cleanup changes so stale per-PDF caches re-parse
+_DOC_CACHE_VERSION = 1
+
+# Filename -> metadata table for the bundled statutes; built once at import
+# instead of reconstructing the literal on every _get_pdf_metadata call
+_PDF_METADATA_MAP = {
+    "muslim-women-protection-of-rights-on-divorce-act-1986": {
+        "title": "The Muslim Women (Protection of Rights on Divorce) Act, 1986",
+        "category": "family_law",
+        "source": "Government of India"
+    },
+    "muslim-marriages-registration-act-1981": {
+        "title": "Jammu and Kashmir Muslim Marriages Registration Act, 1981",
+        "category": "family_law",
+        "source": "Government of J&K"
+    },
+    "hindu-adoption-and-maintenance-act": {
+        "title": "The Hindu Adoptions and Maintenance Act, 1956",
+        "category": "family_law",
+        "source": "Government of India"
+    },
+    "sale-of-goods-act": {
+        "title": "The Sale of Goods Act, 1930",
+        "category": "commercial_law",
+        "source": "Government of India"
+    },
+    "the-hindu-succession-act1956": {
+        "title": "The Hindu Succession Act, 1956",
+        "category": "family_law",
+        "source": "Government of India"
+    },
+    "limitation-act": {
+        "title": "The Limitation Act, 1963",
+        "category": "procedural_law",
+        "source": "Government of India"
+    },
+    "tpa": {
+        "title": "The Transfer of Property Act, 1882",
+        "category": "property_law",
+        "source": "Government of India"
+    },
+    "dissolution-of-muslim-marriage-act": {
+        "title": "The Dissolution of Muslim Marriages Act, 1939",
+        "category": "family_law",
+        "source": "Government of India"
+    },
+    "evidence-act": {
+        "title": "The Indian Evidence Act, 1872",
+        "category": "evidence_law",
+        "source": "Government of India"
+    },
+    "hindu-marriage-act": {
+        "title": "The Hindu Marriage Act, 1955",
+        "category": "family_law",
+        "source": "Government of India"
+    },
+    "negotiable-instruments-act-1881": {
+        "title": "The Negotiable Instruments Act, 1881",
+        "category": "commercial_law",
+        "source": "Government of India"
+    },
+    "contract-act": {
+        "title": "The Indian Contract Act, 1872",
+        "category": "contract_law",
+        "source": "Government of India"
+    },
+    "the-bharatiya-sakshya-adhiniyam-2023": {
+        "title": "The Bharatiya Sakshya Adhiniyam, 2023",
+        "category": "evidence_law",
+        "source": "Government of India"
+    },
+    "ipc-bare-act": {
+        "title": "The Indian Penal Code, 1860",
+        "category": "criminal_law",
+        "source": "Government of India"
+    },
+    "the-bharatiya-nyaya-sanhita-2023": {
+        "title": "The Bharatiya Nyaya Sanhita, 2023",
+        "category": "criminal_law",
+        "source": "Government of India"
+    },
+    "crpc-bare-act-1973": {
+        "title": "The Code of Criminal Procedure, 1973",
+        "category": "procedural_law",
+        "source": "Government of India"
+    },
+    "bharatiya-nagarik-suraksha-sanhita-2023": {
+        "title": "The Bharatiya Nagarik Suraksha Sanhita, 2023",
+        "category": "procedural_law",
+        "source": "Government of India"
+    },
+    "cpc-bare-act": {
+        "title": "The Code of Civil Procedure, 1908",
+        "category": "civil_law",
+        "source": "Government of India"
+    }
+}
+
+# One compiled alternation scans the filename once for all known keys
+# (longest keys first so the most specific entry wins)
+_PDF_METADATA_RE = re.compile(
+    "|".join(sorted(map(re.escape, _PDF_METADATA_MAP), key=len, reverse=True))
+)
+
+# Filename -> id normalization table shared by the PDF and text loaders
+_ID_TRANS = str.maketrans({'-': '_', ' ': '_'})
+
+
+@functools.lru_cache(maxsize=None)
+def _pdf_metadata_for(filename: str) -> Dict[str, str]:
+    """Resolve PDF metadata for a filename; pure, so memoized across reloads"""
+    filename_lower = filename.lower()
+
+    # Try to match filename with metadata in a single scan
+    match = _PDF_METADATA_RE.search(filename_lower)
+    if match:
+        return _PDF_METADATA_MAP[match.group(0)]
+
+    # Default metadata if no match found
+    clean_name = filename.replace('.pdf', '').replace('-', ' ').replace('_', ' ').title()
+    return {
+        "title": clean_name,
+        "category": "general_law",
+        "source": "Legal Document"
+    }
+
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[str]:
+    """Extract text for a contiguous page range with a private document handle
+
+    PyMuPDF Document objects are not safe to share across threads, so each
+    worker opens its own handle; xref parsing is cheap next to page text
+    extraction on large bare acts.
+    """
+    doc = fitz.open(file_path)
+    try:
+        return [doc.load_page(i).get_text("text") for i in range(start, end)]
+    finally:
+        doc.close()
+
+def _extract_text_from_pdf(file_path: str) -> str:
+    """Extract text from a PDF; module-level so process-pool workers can pickle it"""
+    content = ""
+
+    try:
+        # Method 1: Try PyMuPDF (fitz) first - usually better for complex PDFs
+        try:
+            doc = fitz.open(file_path)
+            page_count = len(doc)
+
+            if page_count > 32:
+                # Hundreds-of-pages acts: split into ranges and extract in
+                # parallel (get_text releases the GIL)
+                doc.close()
+                workers = min(4, (page_count + 31) // 32)
+                bounds = [
+                    (file_path, i * page_count // workers, (i + 1) * page_count // workers)
+                    for i in range(workers)
+                ]
+                page_texts = []
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for chunk in executor.map(lambda b: _extract_page_range(*b), bounds):
+                        page_texts.extend(chunk)
+            else:
+                page_texts = [doc.load_page(i).get_text("text") for i in range(page_count)]
+                doc.close()
+
+            content = "".join(
+                f"\n--- Page {page_num + 1} ---\n{page_text}"
+                for page_num, page_text in enumerate(page_texts)
+                if page_text.strip()
+            )
+
+            if content.strip():
+                logger.info(f"Extracted text using PyMuPDF from {os.path.basename(file_path)}")
+                return _clean_extracted_text(content)
+        except Exception as e:
+            logger.warning(f"PyMuPDF extraction failed for {file_path}: {str(e)}")
+
+        # Method 2: Fallback to PyPDF2
+        try:
+            with open(file_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+
+                content = "".join(
+                    f"\n--- Page {page_num + 1} ---\n{page_text}"
+                    for page_num, page in enumerate(pdf_reader.pages)
+                    if (page_text := page.extract_text()).strip()
+                )
+
+            if content.strip():
+                logger.info(f"Extracted text using PyPDF2 from {os.path.basename(file_path)}")
+                return _clean_extracted_text(content)
+        except Exception as e:
+            logger.warning(f"PyPDF2 extraction failed for {file_path}: {str(e)}")
+
+    except Exception as e:
+        logger.error(f"All PDF extraction methods failed for {file_path}: {str(e)}")
+
+    return content.strip()
+
+def _clean_extracted_text(text: str) -> str:
+    """Clean and normalize extracted PDF text"""
+    if not text:
+        return ""
+
+    # Strip nulls and fold odd control whitespace in a single pass
+    text = text.translate(_CLEAN_TABLE)
+
+    # Remove excessive whitespace
+    text = _WS_RE.sub(' ', text)
+
+    # Fix common PDF extraction issues
+    text = _HYPHEN_RE.sub(r'\1\2', text)  # Fix hyphenated words across lines
+
+    # Normalize line breaks
+    text = _MULTI_NL_RE.sub('\n\n', text)
+
+    # Remove page headers/footers patterns (customize as needed)
+    text = _PAGE_HEADER_RE.sub('', text)
+
+    return text.strip()
+
+
 class LegalKnowledgeBase:
     """Manages legal reference documents and knowledge base"""
     
@@ -16,7 +278,19 @@ class LegalKnowledgeBase:
         self.data_dir = data_dir
         self.documents = []
         self.document_index = {}
-        
+        # Category -> documents index and counts maintained at insertion so
+        # category queries don't rescan the whole corpus
+        self._by_category = {}
+        self._category_counts = Counter()
+        # Running totals kept current at insertion so stats reads are O(1)
+        self._total_content_length = 0
+        self._file_type_counts = Counter()
+        # (query, category) -> document ids for exact repeat searches
+        self._search_cache = {}
+        self._search_cache_maxsize = 256
+        # Token -> document indexes, built lazily on first search
+        self._inverted_index = None
+
         # Ensure data directory exists
         os.makedirs(self.data_dir, exist_ok=True)
     
@@ -24,282 +298,293 @@ class LegalKnowledgeBase:
         """Load all legal documents from the data directory (both PDF and text files)"""
         try:
             logger.info("Loading legal knowledge base documents...")
-            
+
+            # Warm start: reuse the parsed corpus when no source file changed
+            cache_key = self._corpus_cache_key()
+            if self._load_from_cache(cache_key):
+                logger.info(f"Legal knowledge base loaded from cache with {len(self.documents)} documents")
+                return
+
+            # One directory walk feeds both loaders; the cache-key scandir
+            # above already warmed the dentry cache for it
+            pdf_files = []
+            text_entries = []
+            with os.scandir(self.data_dir) as it:
+                for entry in it:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    name_lower = entry.name.lower()
+                    if name_lower.endswith('.pdf'):
+                        pdf_files.append(entry.name)
+                    elif name_lower.endswith('.txt'):
+                        text_entries.append(entry)
+
             # First load PDF files
-            self._load_pdf_files()
-            
+            self._load_pdf_files(pdf_files)
+
             # Then load any existing text files (for backward compatibility)
-            self._load_text_files()
-            
+            self._load_text_files(text_entries)
+
+            self._write_cache(cache_key)
+
             logger.info(f"Legal knowledge base loaded with {len(self.documents)} documents")
-            
+
         except Exception as e:
             logger.error(f"Failed to load legal documents: {str(e)}")
             raise
+
+    def _corpus_cache_key(self) -> List:
+        """Fingerprint the source files by name, mtime, and size"""
+        entries = []
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                if (entry.is_file(follow_symlinks=False)
+                        and entry.name.lower().endswith(('.pdf', '.txt'))):
+                    stat = entry.stat()
+                    entries.append((entry.name, stat.st_mtime_ns, stat.st_size))
+        entries.sort()
+        return entries
+
+    def _load_from_cache(self, cache_key: List) -> bool:
+        """Repopulate the knowledge base from the parsed-corpus cache"""
+        cache_path = os.path.join(self.data_dir, ".kb_cache.pkl")
+        try:
+            with open(cache_path, 'rb') as f:
+                payload = pickle.loads(zlib.decompress(f.read()))
+
+            if payload.get("key") != cache_key:
+                return False
+
+            for document in payload["documents"]:
+                self._index_document(document)
+            return True
+
+        except FileNotFoundError:
+            return False
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable knowledge-base cache: {str(e)}")
+            return False
+
+    def _write_cache(self, cache_key: List):
+        """Persist the parsed corpus so the next start skips PDF extraction"""
+        cache_path = os.path.join(self.data_dir, ".kb_cache.pkl")
+        try:
+            # Serialize once and emit the whole payload with a single write
+            # instead of streaming through the buffered-IO stack; legal prose
+            # compresses several-fold, cutting both disk footprint and the
+            # warm-start read
+            data = zlib.compress(
+                pickle.dumps(
+                    {"key": cache_key, "documents": self.documents},
+                    protocol=pickle.HIGHEST_PROTOCOL
+                ),
+                level=6
+            )
+            # Write to a temp file and rename so concurrent or interrupted
+            # writers can never leave a half-written cache behind
+            tmp_path = f"{cache_path}.tmp.{os.getpid()}"
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            os.replace(tmp_path, cache_path)
+            logger.info(f"Cached parsed knowledge base to {cache_path}")
+        except Exception as e:
+            logger.warning(f"Failed to write knowledge-base cache: {str(e)}")
     
-    def _load_pdf_files(self):
-        """Load and process all PDF files from the legal_data directory"""
+    def _load_pdf_files(self, pdf_files: List[str]):
+        """Load and process the given PDF files from the legal_data directory"""
         try:
-            pdf_files = [f for f in os.listdir(self.data_dir) if f.lower().endswith('.pdf')]
-            
             logger.info(f"Found {len(pdf_files)} PDF files to process")
-            
+
+            if not pdf_files:
+                return
+
+            # Per-file parse cache: unchanged PDFs reuse their extracted text
+            # from the previous run, so adding or editing one file does not
+            # force the whole corpus back through the parser
+            contents = {}
+            misses = []
             for pdf_file in pdf_files:
-                file_path = os.path.join(self.data_dir, pdf_file)
+                path = os.path.join(self.data_dir, pdf_file)
+                cache_path = self._doc_cache_path(pdf_file, path)
+                if cache_path is not None:
+                    try:
+                        with open(cache_path, 'r', encoding='utf-8') as f:
+                            contents[pdf_file] = f.read()
+                        continue
+                    except OSError:
+                        pass
+                misses.append((pdf_file, path, cache_path))
+
+            # Extraction is CPU-bound in the PDF parser, so fan the misses out
+            # across processes; results are consumed in submission order to
+            # keep document ordering deterministic
+            if misses:
+                workers = min(os.cpu_count() or 1, 4, len(misses))
+                # spawn, not fork: this runs while sibling init threads are
+                # loading torch models, and forking a multi-threaded process
+                # with OpenMP runtimes resident can deadlock the children
+                ctx = multiprocessing.get_context("spawn")
+                with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as executor:
+                    extracted = executor.map(_extract_text_from_pdf, [m[1] for m in misses])
+                    for (pdf_file, _, cache_path), content in zip(misses, extracted):
+                        contents[pdf_file] = content
+                        if content and cache_path is not None:
+                            self._write_doc_cache(cache_path, content)
+
+            for pdf_file in pdf_files:
+                content = contents.get(pdf_file)
                 logger.info(f"Processing PDF: {pdf_file}")
-                
-                # Extract text from PDF
-                content = self._extract_text_from_pdf(file_path)
-                
+
                 if content and len(content.strip()) > 100:  # Minimum content check
                     # Create document metadata
                     doc_info = self._get_pdf_metadata(pdf_file)
-                    
+
                     document = {
-                        "id": f"pdf_{pdf_file.replace('.pdf', '').replace('-', '_').replace(' ', '_').lower()}",
+                        "id": f"pdf_{pdf_file.removesuffix('.pdf').translate(_ID_TRANS).lower()}",
                         "title": doc_info["title"],
                         "content": content,
                         "category": doc_info["category"],
                         "source": doc_info["source"],
                         "filename": pdf_file,
                         "file_type": "pdf",
-                        "content_length": len(content)
+                        "content_length": len(content),
+                        # Lowercased once so search_documents does not
+                        # re-lower text per query; the content copy is
+                        # materialized lazily on first search instead of
+                        # held resident for users who never search
+                        "_title_lower": doc_info["title"].lower()
                     }
-                    
-                    self.documents.append(document)
-                    self.document_index[document["id"]] = document
-                    
+
+                    self._index_document(document)
+
                     logger.info(f"Successfully loaded: {doc_info['title']} ({len(content)} characters)")
                 else:
                     logger.warning(f"Failed to extract sufficient content from: {pdf_file}")
-                    
+                
         except Exception as e:
             logger.error(f"Failed to load PDF files: {str(e)}")
-    
+
+    def _doc_cache_path(self, pdf_file: str, path: str) -> str:
+        """Per-file cache path keyed by name, size and mtime of the PDF"""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        digest = hashlib.sha256(
+            f"{_DOC_CACHE_VERSION}:{pdf_file}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8')
+        ).hexdigest()
+        return os.path.join(self.data_dir, ".cache", f"doc-{digest}.txt")
+
+    def _write_doc_cache(self, cache_path: str, content: str):
+        """Atomically persist one PDF's extracted text for the next startup"""
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = f"{cache_path}.tmp.{os.getpid()}"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(content)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write document cache {cache_path}: {str(e)}")
+
     def _extract_text_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF using multiple methods for best results"""
-        content = ""
-        
-        try:
-            # Method 1: Try PyMuPDF (fitz) first - usually better for complex PDFs
-            try:
-                doc = fitz.open(file_path)
-                for page_num in range(len(doc)):
-                    page = doc.load_page(page_num)
-                    page_text = page.get_text()
-                    if page_text.strip():
-                        content += f"\n--- Page {page_num + 1} ---\n{page_text}"
-                doc.close()
-                
-                if content.strip():
-                    logger.info(f"Extracted text using PyMuPDF from {os.path.basename(file_path)}")
-                    return self._clean_extracted_text(content)
-            except Exception as e:
-                logger.warning(f"PyMuPDF extraction failed for {file_path}: {str(e)}")
-            
-            # Method 2: Fallback to PyPDF2
-            try:
-                with open(file_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    content = ""
-                    
-                    for page_num in range(len(pdf_reader.pages)):
-                        page = pdf_reader.pages[page_num]
-                        page_text = page.extract_text()
-                        if page_text.strip():
-                            content += f"\n--- Page {page_num + 1} ---\n{page_text}"
-                
-                if content.strip():
-                    logger.info(f"Extracted text using PyPDF2 from {os.path.basename(file_path)}")
-                    return self._clean_extracted_text(content)
-            except Exception as e:
-                logger.warning(f"PyPDF2 extraction failed for {file_path}: {str(e)}")
-                
-        except Exception as e:
-            logger.error(f"All PDF extraction methods failed for {file_path}: {str(e)}")
-        
-        return content.strip()
-    
+        return _extract_text_from_pdf(file_path)
+
     def _clean_extracted_text(self, text: str) -> str:
         """Clean and normalize extracted PDF text"""
-        if not text:
-            return ""
-        
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
-        
-        # Fix common PDF extraction issues
-        text = text.replace('', '')  # Remove null bytes
-        text = re.sub(r'(\w)-\s*\n\s*(\w)', r'\1\2', text)  # Fix hyphenated words across lines
-        
-        # Normalize line breaks
-        text = re.sub(r'\n\s*\n\s*\n+', '\n\n', text)
-        
-        # Remove page headers/footers patterns (customize as needed)
-        text = re.sub(r'Page \d+.*?\n', '', text, flags=re.IGNORECASE)
-        
-        return text.strip()
-    
+        return _clean_extracted_text(text)
+
     def _get_pdf_metadata(self, filename: str) -> Dict[str, str]:
         """Get metadata for PDF files based on filename"""
-        filename_lower = filename.lower()
-        
-        # Define metadata mappings based on your uploaded files
-        metadata_map = {
-            "muslim-women-protection-of-rights-on-divorce-act-1986": {
-                "title": "The Muslim Women (Protection of Rights on Divorce) Act, 1986",
-                "category": "family_law",
-                "source": "Government of India"
-            },
-            "muslim-marriages-registration-act-1981": {
-                "title": "Jammu and Kashmir Muslim Marriages Registration Act, 1981",
-                "category": "family_law",
-                "source": "Government of J&K"
-            },
-            "hindu-adoption-and-maintenance-act": {
-                "title": "The Hindu Adoptions and Maintenance Act, 1956",
-                "category": "family_law",
-                "source": "Government of India"
-            },
-            "sale-of-goods-act": {
-                "title": "The Sale of Goods Act, 1930",
-                "category": "commercial_law",
-                "source": "Government of India"
-            },
-            "the-hindu-succession-act1956": {
-                "title": "The Hindu Succession Act, 1956",
-                "category": "family_law",
-                "source": "Government of India"
-            },
-            "limitation-act": {
-                "title": "The Limitation Act, 1963",
-                "category": "procedural_law",
-                "source": "Government of India"
-            },
-            "tpa": {
-                "title": "The Transfer of Property Act, 1882",
-                "category": "property_law",
-                "source": "Government of India"
-            },
-            "dissolution-of-muslim-marriage-act": {
-                "title": "The Dissolution of Muslim Marriages Act, 1939",
-                "category": "family_law",
-                "source": "Government of India"
-            },
-            "evidence-act": {
-                "title": "The Indian Evidence Act, 1872",
-                "category": "evidence_law",
-                "source": "Government of India"
-            },
-            "hindu-marriage-act": {
-                "title": "The Hindu Marriage Act, 1955",
-                "category": "family_law",
-                "source": "Government of India"
-            },
-            "negotiable-instruments-act-1881": {
-                "title": "The Negotiable Instruments Act, 1881",
-                "category": "commercial_law",
-                "source": "Government of India"
-            },
-            "contract-act": {
-                "title": "The Indian Contract Act, 1872",
-                "category": "contract_law",
-                "source": "Government of India"
-            },
-            "the-bharatiya-sakshya-adhiniyam-2023": {
-                "title": "The Bharatiya Sakshya Adhiniyam, 2023",
-                "category": "evidence_law",
-                "source": "Government of India"
-            },
-            "ipc-bare-act": {
-                "title": "The Indian Penal Code, 1860",
-                "category": "criminal_law",
-                "source": "Government of India"
-            },
-            "the-bharatiya-nyaya-sanhita-2023": {
-                "title": "The Bharatiya Nyaya Sanhita, 2023",
-                "category": "criminal_law",
-                "source": "Government of India"
-            },
-            "crpc-bare-act-1973": {
-                "title": "The Code of Criminal Procedure, 1973",
-                "category": "procedural_law",
-                "source": "Government of India"
-            },
-            "bharatiya-nagarik-suraksha-sanhita-2023": {
-                "title": "The Bharatiya Nagarik Suraksha Sanhita, 2023",
-                "category": "procedural_law",
-                "source": "Government of India"
-            },
-            "cpc-bare-act": {
-                "title": "The Code of Civil Procedure, 1908",
-                "category": "civil_law",
-                "source": "Government of India"
-            }
-        }
-        
-        # Try to match filename with metadata
-        for key, metadata in metadata_map.items():
-            if key in filename_lower:
-                return metadata
-        
-        # Default metadata if no match found
-        clean_name = filename.replace('.pdf', '').replace('-', ' ').replace('_', ' ').title()
-        return {
-            "title": clean_name,
-            "category": "general_law",
-            "source": "Legal Document"
-        }
+        return _pdf_metadata_for(filename)
     
-    def _load_text_files(self):
+    def _load_text_files(self, text_entries: List[os.DirEntry]):
         """Load existing text files for backward compatibility"""
         try:
-            text_files = [f for f in os.listdir(self.data_dir) if f.lower().endswith('.txt')]
-            
-            for txt_file in text_files:
-                file_path = os.path.join(self.data_dir, txt_file)
-                content = self._load_text_file(file_path)
-                
+            if not text_entries:
+                return
+
+            # Overlap the independent reads so cold-cache latency is paid
+            # once across files rather than once per file; read failures are
+            # handled here per file instead of inside _load_text_file
+            with ThreadPoolExecutor(max_workers=min(8, len(text_entries))) as executor:
+                futures = [executor.submit(self._load_text_file, e.path) for e in text_entries]
+
+            for entry, future in zip(text_entries, futures):
+                txt_file = entry.name
+                try:
+                    content = future.result()
+                except (OSError, UnicodeDecodeError) as e:
+                    logger.error(f"Failed to load file {entry.path}: {str(e)}")
+                    continue
+
                 if content:
                     # Avoid duplicates - check if we already have this content from PDF
-                    doc_id = f"txt_{txt_file.replace('.txt', '').replace('-', '_').replace(' ', '_').lower()}"
-                    
+                    doc_id = f"txt_{txt_file.removesuffix('.txt').translate(_ID_TRANS).lower()}"
+
                     if doc_id not in self.document_index:
+                        title = txt_file.replace('_', ' ').replace('.txt', '').title()
                         document = {
                             "id": doc_id,
-                            "title": txt_file.replace('_', ' ').replace('.txt', '').title(),
+                            "title": title,
                             "content": content,
                             "category": "additional_text",
                             "source": "Local Text File",
                             "filename": txt_file,
                             "file_type": "text",
-                            "content_length": len(content)
+                            "content_length": len(content),
+                            "_title_lower": title.lower()
                         }
                         
-                        self.documents.append(document)
-                        self.document_index[document["id"]] = document
+                        self._index_document(document)
                         logger.info(f"Loaded text file: {txt_file}")
                         
         except Exception as e:
             logger.error(f"Failed to load text files: {str(e)}")
     
     def _load_text_file(self, file_path: str) -> str:
-        """Load content from a text file"""
+        """Load content from a text file; read errors propagate to the caller"""
+        # One read + one decode instead of pushing every byte through the
+        # buffered text-IO stack; the size check also short-circuits tiny
+        # files before reading them at all
+        fd = os.open(file_path, os.O_RDONLY)
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read().strip()
-            
-            # Basic content validation
-            if len(content) < 100:  # Minimum content length
+            size = os.fstat(fd).st_size
+            if size < 100:  # Minimum content length
                 logger.warning(f"File {file_path} has very little content")
                 return None
-            
-            return content
-            
-        except Exception as e:
-            logger.error(f"Failed to load file {file_path}: {str(e)}")
+            # For large statutes, tell the kernel this is one sequential
+            # pass so readahead ramps up and pages aren't kept hot
+            if size >= 2 * 1024 * 1024 and hasattr(os, 'posix_fadvise'):
+                os.posix_fadvise(fd, 0, size, os.POSIX_FADV_SEQUENTIAL)
+            data = os.read(fd, size)
+        finally:
+            os.close(fd)
+
+        content = data.decode('utf-8').strip()
+
+        # Basic content validation (size can exceed stripped length)
+        if len(content) < 100:  # Minimum content length
+            logger.warning(f"File {file_path} has very little content")
             return None
+
+        return content
     
+    def _index_document(self, document: Dict[str, Any]):
+        """Register a loaded document in the list and lookup indexes"""
+        self.documents.append(document)
+        self.document_index[document["id"]] = document
+        self._by_category.setdefault(document["category"], []).append(document)
+        self._category_counts[document["category"]] += 1
+        self._file_type_counts[document.get("file_type", "unknown")] += 1
+        self._total_content_length += document["content_length"]
+        # New documents can change any cached result set or posting list
+        self._search_cache.clear()
+        self._inverted_index = None
+
     def get_all_documents(self) -> List[Dict[str, Any]]:
         """Get all loaded documents"""
         return self.documents
@@ -308,66 +593,128 @@ class LegalKnowledgeBase:
         """Get a specific document by ID"""
         return self.document_index.get(doc_id)
     
+    def _folded_fields(self, doc: Dict[str, Any]):
+        """Materialize the ASCII-folded title/content copies on first use"""
+        title_bytes = doc.get("_title_bytes")
+        if title_bytes is None:
+            title_bytes = doc["_title_lower"].encode('ascii', 'ignore')
+            doc["_title_bytes"] = title_bytes
+
+        content_bytes = doc.get("_content_bytes")
+        if content_bytes is None:
+            content_bytes = doc["content"].lower().encode('ascii', 'ignore')
+            doc["_content_bytes"] = content_bytes
+
+        return title_bytes, content_bytes
+
+    def _build_inverted_index(self):
+        """Build the token -> document indexes map used to prune searches"""
+        inverted = {}
+        for idx, doc in enumerate(self.documents):
+            title_bytes, content_bytes = self._folded_fields(doc)
+            tokens = set(_TOKEN_RE.findall(title_bytes))
+            tokens.update(_TOKEN_RE.findall(content_bytes))
+            for token in tokens:
+                inverted.setdefault(token, []).append(idx)
+        self._inverted_index = inverted
+        logger.info(f"Built inverted search index with {len(inverted)} tokens")
+
     def search_documents(self, query: str, category: str = None) -> List[Dict[str, Any]]:
         """Search documents by content or title"""
+        # Exact repeat queries skip the scan entirely
+        cache_key = (query, category)
+        cached_ids = self._search_cache.get(cache_key)
+        if cached_ids is not None:
+            return [self.document_index[doc_id] for doc_id in cached_ids]
+
         results = []
-        query_lower = query.lower()
-        
-        for doc in self.documents:
-            if category and doc["category"] != category:
-                continue
-            
-            # Search in title and content
-            if (query_lower in doc["title"].lower() or 
-                query_lower in doc["content"].lower()):
+        # ASCII-folded bytes matching runs through libc's SIMD memmem path;
+        # folding both sides the same way keeps matches consistent
+        query_bytes = query.lower().encode('ascii', 'ignore')
+
+        # A purely non-ASCII query folds to empty bytes, and an empty pattern
+        # matches every document; scan the unfolded text for those instead
+        if query and not query_bytes:
+            query_lower = query.lower()
+            candidates = self._by_category.get(category, []) if category else self.documents
+            results = [
+                doc for doc in candidates
+                if query_lower in doc["_title_lower"] or query_lower in doc["content"].lower()
+            ]
+            if len(self._search_cache) >= self._search_cache_maxsize:
+                self._search_cache.pop(next(iter(self._search_cache)))
+            self._search_cache[cache_key] = [doc["id"] for doc in results]
+            return results
+
+        pattern = _compile_query(query_bytes)
+
+        # A purely word-character query can only match inside a single token,
+        # so the inverted index narrows the scan to documents whose vocabulary
+        # contains the query as a token substring. Queries spanning token
+        # boundaries (spaces, punctuation) fall back to the full scan.
+        if query_bytes and _TOKEN_RE.fullmatch(query_bytes):
+            if self._inverted_index is None:
+                self._build_inverted_index()
+
+            candidate_idxs = set()
+            for token, doc_idxs in self._inverted_index.items():
+                if query_bytes in token:
+                    candidate_idxs.update(doc_idxs)
+
+            candidates = [self.documents[i] for i in sorted(candidate_idxs)]
+            if category:
+                candidates = [doc for doc in candidates if doc["category"] == category]
+        else:
+            # Category filters walk only that category's bucket
+            candidates = self._by_category.get(category, []) if category else self.documents
+
+        for doc in candidates:
+            title_bytes, content_bytes = self._folded_fields(doc)
+            if pattern.search(title_bytes) or pattern.search(content_bytes):
                 results.append(doc)
-        
+
+        if len(self._search_cache) >= self._search_cache_maxsize:
+            self._search_cache.pop(next(iter(self._search_cache)))
+        self._search_cache[cache_key] = [doc["id"] for doc in results]
+
         return results
     
     def get_categories(self) -> List[str]:
         """Get all available document categories"""
-        categories = set()
-        for doc in self.documents:
-            categories.add(doc["category"])
-        return sorted(list(categories))
+        return sorted(self._by_category)
     
     def get_document_count(self) -> Dict[str, int]:
         """Get count of documents by category"""
-        counts = {}
-        for doc in self.documents:
-            category = doc["category"]
-            counts[category] = counts.get(category, 0) + 1
-        return counts
+        return dict(self._category_counts)
     
     def get_documents_by_category(self, category: str) -> List[Dict[str, Any]]:
         """Get all documents in a specific category"""
-        return [doc for doc in self.documents if doc["category"] == category]
+        return list(self._by_category.get(category, []))
     
     def get_document_stats(self) -> Dict[str, Any]:
         """Get statistics about the loaded documents"""
         total_docs = len(self.documents)
-        total_content_length = sum(doc["content_length"] for doc in self.documents)
-        
-        # File type breakdown
-        file_types = {}
-        for doc in self.documents:
-            file_type = doc.get("file_type", "unknown")
-            file_types[file_type] = file_types.get(file_type, 0) + 1
-        
+        total_content_length = self._total_content_length
+
         return {
             "total_documents": total_docs,
             "total_content_length": total_content_length,
             "average_content_length": total_content_length // total_docs if total_docs > 0 else 0,
-            "categories": self.get_document_count(),
-            "file_types": file_types,
-            "category_list": self.get_categories()
+            "categories": dict(self._category_counts),
+            "file_types": dict(self._file_type_counts),
+            "category_list": sorted(self._by_category)
         }
     
     def export_knowledge_base(self, output_file: str):
         """Export knowledge base to JSON file"""
         try:
             export_data = {
-                "documents": self.documents,
+                # Drop internal underscore-prefixed helper fields (lowercase
+                # search copies) so the export stays the document payload only
+                "documents": [
+                    {k: v for k, v in doc.items() if not k.startswith('_')}
+                    for doc in self.documents
+                ],
                 "metadata": {
                     "total_documents": len(self.documents),
                     "categories": self.get_categories(),
@@ -375,9 +722,15 @@ class LegalKnowledgeBase:
                     "statistics": self.get_document_stats()
                 }
             }
-            
-            with open(output_file, 'w', encoding='utf-8') as f:
-                json.dump(export_data, f, indent=2, ensure_ascii=False)
+
+            if orjson is not None:
+                # orjson serializes in C and emits UTF-8 bytes directly,
+                # skipping json's pure-Python pretty printer and re-encode
+                with open(output_file, 'wb') as f:
+                    f.write(orjson.dumps(export_data, option=orjson.OPT_INDENT_2))
+            else:
+                with open(output_file, 'w', encoding='utf-8') as f:
+                    json.dump(export_data, f, indent=2, ensure_ascii=False)
                 
             logger.info(f"Knowledge base exported to {output_file}")
             
@@ -388,7 +741,9 @@ class LegalKnowledgeBase:
     def create_document_summary(self) -> str:
         """Create a summary of all loaded documents"""
         stats = self.get_document_stats()
-        summary = f"""
+        # Collect the parts and join once; += re-copies the growing report
+        # on every line
+        parts = [f"""
 Legal Knowledge Base Summary:
 ============================
 
@@ -398,16 +753,16 @@ Average Document Length: {stats['average_content_length']:,} characters
 
 Categories:
 -----------
-"""
+"""]
         for category, count in sorted(stats['categories'].items()):
-            summary += f"• {category.replace('_', ' ').title()}: {count} documents\n"
-        
-        summary += f"\nFile Types:\n-----------\n"
+            parts.append(f"• {category.replace('_', ' ').title()}: {count} documents\n")
+
+        parts.append("\nFile Types:\n-----------\n")
         for file_type, count in sorted(stats['file_types'].items()):
-            summary += f"• {file_type.upper()}: {count} files\n"
-        
-        summary += f"\nDocument List:\n--------------\n"
+            parts.append(f"• {file_type.upper()}: {count} files\n")
+
+        parts.append("\nDocument List:\n--------------\n")
         for doc in sorted(self.documents, key=lambda x: x['category']):
-            summary += f"• {doc['title']} ({doc['category']})\n"
-        
-        return summary
+            parts.append(f"• {doc['title']} ({doc['category']})\n")
+
+        return "".join(parts)